@@ -1,47 +1,114 @@
 #!/usr/bin/env python3
 
 import argparse
+import email.utils
+import functools
+import hashlib
 import json
 import os
 import sys
 import time
 import asyncio
 import aiohttp
-import aiofiles
 import logging
-import yt_dlp
-import cloudscraper
+import logging.handlers
+import mmap
+import queue
 import random
+import re
 import signal
+import sqlite3
+import threading
 try:
-    import undetected_chromedriver as uc
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    SELENIUM_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    SELENIUM_AVAILABLE = False
+    ORJSON_AVAILABLE = False
+try:
+    import brotli  # noqa: F401 - aiohttp decodes 'br' responses only when this is installed
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:  # Not available on Windows
+    UVLOOP_AVAILABLE = False
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.console import Console
 from rich.logging import RichHandler
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NoReturn
 
 console = Console()
 
+# orjson parses large saved.json exports several times faster than the stdlib;
+# its JSONDecodeError subclasses json.JSONDecodeError, so error handling is shared
+json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+def json_dumps(obj) -> bytes:
+    """Serialize obj as indented UTF-8 JSON, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+# yt-dlp, cloudscraper and Selenium are only needed for video downloads and fetching
+# from Reddit, so they are imported on first use to keep startup fast for --input runs
+@functools.lru_cache(maxsize=None)
+def load_selenium():
+    """Import undetected-chromedriver and Selenium, returning (uc, By) or None if not installed"""
+    try:
+        import undetected_chromedriver as uc
+        from selenium.webdriver.common.by import By
+    except ImportError:
+        return None
+    return uc, By
+
+@functools.lru_cache(maxsize=None)
+def load_yt_dlp():
+    """Import yt-dlp, returning the module or None if not installed"""
+    try:
+        import yt_dlp
+    except ImportError:
+        return None
+    return yt_dlp
+
 class RedditMediaDownloader:
+    # Anything that is not a word character or '-' is replaced in filenames
+    # (\w matches exactly str.isalnum() plus '_', so unicode titles are kept)
+    _FILENAME_UNSAFE_RE = re.compile(r'[^\w-]')
+    # Extensions downloaded directly over HTTP
+    _MEDIA_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.mp4', '.webm', '.gifv'})
+    # Query parameters that only select a rendition of the same media (utm_* is dropped too)
+    _IGNORED_QUERY_PARAMS = frozenset({'width', 'height', 'format', 'auto'})
+    # Hosts whose extensionless URLs are handled elsewhere and are not worth a warning
+    _KNOWN_DOMAINS = ('redgifs.com', 'reddit.com', 'v.redd.it')
+
     def __init__(self, output_dir: str, max_concurrent: int = 5, filename_style: str = 'basic', log_file: str = None, debug: bool = False):
         self.output_dir = os.path.abspath(output_dir)
         os.makedirs(self.output_dir, exist_ok=True)  # Create output directory if it doesn't exist
         self.max_concurrent = max_concurrent
         self.filename_style = filename_style
+        # The style is fixed for the run, so pick its formatter once instead of per URL
+        self._format_filename = {
+            'basic': self._basic_filename,
+            'pretty': self._pretty_filename,
+            'advanced': self._advanced_filename,
+        }.get(filename_style, self._url_filename)
         self.session = None
-        self.processed_urls = set()  # Track processed URLs
-        self.processed_posts = set()  # Track processed post IDs to prevent duplicates
-        self.download_semaphore = None  # Control concurrent downloads
+        self._redgifs_token = None  # Temporary RedGifs API token shared by all downloads
+        self._redgifs_token_expiry = 0
+        self._redgifs_token_lock = None
+        self._ytdlp_executor = None  # Threads that run the blocking yt-dlp downloads
         self.max_retries = 3  # Maximum retry attempts for failed downloads
-        self.base_delay = 1  # Base delay for exponential backoff
+        self.base_delay = 1  # Minimum delay between retries, see _backoff_delay
+        self.write_buffer_size = 1024 * 1024  # Bytes collected before each disk write
+        self._existing_files = {}  # Output directory file sizes by name, see _scan_output_dir
+        self._rate_limited_until = {}  # Host -> event loop time until which it is rate limiting us
+        self.progress_interval = 0.5  # Seconds between progress bar updates
+        self._progress_task = None  # The single aggregate bar, created in process_posts
+        self._progress_pending = 0  # Finished downloads not yet shown on the bar
         
         # Create log file directory if specified
         if log_file:
@@ -54,120 +121,314 @@ class RedditMediaDownloader:
             BarColumn(complete_style="cyan", finished_style="bright_cyan"),
             TaskProgressColumn(),
             console=console,
-            refresh_per_second=2  # Reduce update frequency
+            refresh_per_second=1  # Reduce update frequency
         )
         
         # Setup logging with simplified format
         log_format = "%(levelname)s - %(message)s"
-        log_level = logging.DEBUG if debug else logging.INFO
+        rich_handler = RichHandler(console=console, rich_tracebacks=True, show_path=False)
+        rich_handler.setFormatter(logging.Formatter(log_format))
+        self._log_handlers = [rich_handler]
+        self._log_listener = None
         if log_file:
-            logging.basicConfig(
-                level=log_level,
-                format=log_format,
-                handlers=[
-                    RichHandler(console=console, rich_tracebacks=True, show_path=False),
-                    logging.FileHandler(log_file)
-                ]
-            )
+            # Log file writes happen on a listener thread, so a slow disk never stalls downloads
+            file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+            file_handler.setFormatter(logging.Formatter(log_format))
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.setFormatter(logging.Formatter('%(message)s'))  # file_handler adds the level
+            self._log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+            self._log_listener.start()
+            self._log_handlers.append(queue_handler)
+        # Handlers are attached here and detached in close_session rather than via basicConfig,
+        # which is a no-op once the root logger has handlers; so each downloader created in the
+        # same process gets its own --log file and --debug level
+        root_logger = logging.getLogger()
+        self._previous_log_level = root_logger.level
+        root_logger.setLevel(logging.DEBUG if debug else logging.INFO)
+        for handler in self._log_handlers:
+            root_logger.addHandler(handler)
+        
+        # yt-dlp options shared by every video, resolved once instead of per download
+        debug_enabled = logging.getLogger().isEnabledFor(logging.DEBUG)
+        self._ydl_base_opts = {
+            'quiet': not debug_enabled,
+            'no_warnings': not debug_enabled,
+            'verbose': debug_enabled,
+            'ignoreerrors': False,
+            'extractaudio': False,
+            'retries': 2,
+            'fragment_retries': 2,
+            'logger': logging.getLogger('yt-dlp'),
+            'listformats': debug_enabled,  # List available formats in debug mode
+        }
+        
+        # Processed post IDs and URLs persist across runs in SQLite
+        self.db = self._open_state_db()
+
+    @staticmethod
+    def _url_extension(path: str) -> str:
+        """Return the lowercased extension of a URL path's last segment (e.g. '.jpg')"""
+        name = path.rpartition('/')[2]
+        stem, dot, ext = name.rpartition('.')
+        return f".{ext.lower()}" if dot and stem else ''
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _classify_url(url: str):
+        """Return (host, ext, kind) for a URL, where kind is 'redgifs', 'reddit_video' or 'file'"""
+        # Cached: each media URL is classified for collection, naming and download
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        if host.endswith('redgifs.com'):
+            kind = 'redgifs'
+        elif host == 'v.redd.it':
+            kind = 'reddit_video'
         else:
-            logging.basicConfig(
-                level=log_level,
-                format=log_format,
-                handlers=[RichHandler(console=console, rich_tracebacks=True, show_path=False)]
-            )
+            kind = 'file'
+        return host, RedditMediaDownloader._url_extension(parts.path), kind
 
     def _get_media_urls(self, post: Dict[str, Any]) -> List[str]:
         urls = []
+        # Bind nested fields once; Reddit sends null for missing media/preview objects
+        title = post.get('title', 'Untitled')
+        domain = post.get('domain')
+        url_override = post.get('url_overridden_by_dest')
         
         # Check for RedGifs URLs
-        if post.get('domain') == 'redgifs.com' and 'url_overridden_by_dest' in post:
-            logging.info(f"🔄 Processing RedGifs URL: {post.get('title', 'Untitled')}")
-            urls.append(post['url_overridden_by_dest'])
+        if domain == 'redgifs.com' and url_override:
+            logging.info(f"🔄 Processing RedGifs URL: {title}")
+            urls.append(url_override)
         
         # Check for Reddit media URLs
         if post.get('is_video', False):
-            video_data = post.get('media', {}).get('reddit_video', {})
+            video_data = (post.get('media') or {}).get('reddit_video')
             if video_data:
                 if video_data.get('fallback_url'):
-                    logging.info(f"🎥 Processing Reddit Video: {post.get('title', 'Untitled')}")
+                    logging.info(f"🎥 Processing Reddit Video: {title}")
                     urls.append(video_data['fallback_url'])
                 # Add HLS URL as fallback
                 elif video_data.get('hls_url'):
                     urls.append(video_data['hls_url'])
         
         # Check for preview videos
-        preview = post.get('preview', {}).get('reddit_video_preview', {})
-        if preview and preview.get('fallback_url') and not urls:
-            urls.append(preview['fallback_url'])
+        if not urls:
+            preview = (post.get('preview') or {}).get('reddit_video_preview')
+            if preview and preview.get('fallback_url'):
+                urls.append(preview['fallback_url'])
         
         # Check for Reddit video URLs (v.redd.it)
-        if 'url_overridden_by_dest' in post:
-            url = post['url_overridden_by_dest']
-            if 'v.redd.it' in url:
-                logging.info(f"🎥 Processing Reddit Video (v.redd.it): {post.get('title', 'Untitled')}")
-                urls.append(url)
+        if url_override:
+            _, ext, kind = self._classify_url(url_override)
+            if kind == 'reddit_video':
+                logging.info(f"🎥 Processing Reddit Video (v.redd.it): {title}")
+                urls.append(url_override)
             else:
                 # Check for direct image/gif URLs
-                ext = os.path.splitext(url)[1].lower()
-                if ext in ['.jpg', '.jpeg', '.png', '.gif', '.mp4', '.webm', '.gifv']:
-                    logging.info(f"📸 Processing Direct Media: {post.get('title', 'Untitled')}")
-                    urls.append(url)
-                elif ext and ext not in ['.jpg', '.jpeg', '.png', '.gif', '.mp4', '.webm', '.gifv']:
-                    logging.warning(f"⚠️  Unsupported file type '{ext}' for: {post.get('title', 'Untitled')} - {url}")
-                elif not ext and not any(domain in url for domain in ['redgifs.com', 'reddit.com', 'v.redd.it']):
-                    logging.warning(f"⚠️  Unknown URL format: {post.get('title', 'Untitled')} - {url}")
+                if ext in self._MEDIA_EXTS:
+                    logging.info(f"📸 Processing Direct Media: {title}")
+                    urls.append(url_override)
+                elif ext:
+                    logging.warning(f"⚠️  Unsupported file type '{ext}' for: {title} - {url_override}")
+                elif not ext and not any(d in url_override for d in self._KNOWN_DOMAINS):
+                    logging.warning(f"⚠️  Unknown URL format: {title} - {url_override}")
         
         # Log if no media URLs were found
-        if not urls and post.get('url_overridden_by_dest'):
-            domain = post.get('domain', 'unknown')
+        if not urls and url_override:
+            domain = domain or 'unknown'
             if domain not in ['self.', 'reddit.com'] and not domain.endswith('.reddit.com'):
-                logging.info(f"ℹ️  No downloadable media found for: {post.get('title', 'Untitled')} (domain: {domain})")
+                logging.info(f"ℹ️  No downloadable media found for: {title} (domain: {domain})")
         
         return urls
 
     async def init_session(self):
-        self.session = aiohttp.ClientSession()
-        self.download_semaphore = asyncio.Semaphore(self.max_concurrent)  # Initialize semaphore
+        # Most media comes from a handful of hosts (i.redd.it, v.redd.it, redgifs CDN),
+        # so keep connections alive and cache DNS to avoid a TLS handshake per file
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrent * 2,
+            limit_per_host=self.max_concurrent,
+            ttl_dns_cache=300,
+            use_dns_cache=True,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60),
+            headers={
+                'User-Agent': 'reddit-saved-downloader/1.0',
+                # Shrinks RedGifs API JSON and error pages; media bodies are already compressed
+                'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+            },
+            auto_decompress=True
+        )
+        self._redgifs_token_lock = asyncio.Lock()
+        # Each worker holds at most one executor thread at a time (file writes, renames),
+        # so size the default pool to the worker count plus a little headroom
+        asyncio.get_event_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.max_concurrent + 4)
+        )
+        # yt-dlp blocks a thread for a whole video, so it gets its own pool and can never
+        # starve the short file operations and DNS lookups queued on the default executor
+        self._ytdlp_executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='yt-dlp')
 
     async def close_session(self):
         if self.session:
             await self.session.close()
+        if self._ytdlp_executor:
+            self._ytdlp_executor.shutdown(wait=False)
+        self.db.close()
+        if self._log_listener:
+            self._log_listener.stop()  # Flushes queued records to the log file
+            for handler in self._log_listener.handlers:
+                handler.close()
+        root_logger = logging.getLogger()
+        for handler in self._log_handlers:
+            root_logger.removeHandler(handler)
+        root_logger.setLevel(self._previous_log_level)
     
-    def _parse_cookies(self, cookie_string: str) -> dict:
-        """Parse cookie string into a dictionary"""
-        cookies = {}
-        for cookie in cookie_string.split(';'):
-            if '=' in cookie:
-                key, value = cookie.strip().split('=', 1)
-                cookies[key] = value
-        return cookies
+    def _create_scraper(self, cookies: Dict[str, str]):
+        """Create a cloudscraper session carrying the Reddit cookies (blocking, run in the executor)"""
+        import cloudscraper
+        
+        console.print("[blue]🔐 Initializing cloudscraper session...[/blue]")
+        scraper = cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'desktop': True
+            }
+        )
+        
+        # Set enhanced headers to mimic real browser
+        scraper.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate',  # zlib decoding is cheaper per byte than brotli
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Cache-Control': 'max-age=0',
+            'Referer': 'https://www.reddit.com/'
+        })
+        
+        # Set cookies on the scraper session
+        for name, value in cookies.items():
+            scraper.cookies.set(name, value)
+        
+        # Make an initial request to establish session
+        try:
+            initial_response = scraper.get('https://www.reddit.com/')
+            if initial_response.status_code == 200:
+                console.print("[green]✓ Cloudscraper session established[/green]")
+            else:
+                console.print(f"[yellow]⚠️ Initial request returned {initial_response.status_code}[/yellow]")
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Initial session setup failed: {e}[/yellow]")
+        
+        return scraper
     
-    async def fetch_saved_posts_from_reddit(self, cookies: str) -> dict:
-        """Fetch saved posts from Reddit API with pagination using cloudscraper to bypass Cloudflare"""
-        parsed_cookies = self._parse_cookies(cookies)
+    def _create_chrome_driver(self, cookies: Dict[str, str]):
+        """Start undetected Chrome with the Reddit cookies, or return None if unavailable"""
+        selenium = load_selenium()
+        if not selenium:
+            return None
+        uc = selenium[0]
         
-        # Extract username from cookies (from reddit_session token)
-        username = None
-        if 'reddit_session' in parsed_cookies:
-            try:
-                import base64
-                # Decode JWT token to get username (simplified)
-                token_parts = parsed_cookies['reddit_session'].split('.')
-                if len(token_parts) >= 2:
-                    # Add padding if needed
-                    payload = token_parts[1]
-                    payload += '=' * (4 - len(payload) % 4)
-                    decoded = base64.b64decode(payload)
-                    token_data = json.loads(decoded)
-                    if 'sub' in token_data and token_data['sub'].startswith('t2_'):
-                        # For now, we'll use a placeholder username
-                        username = "me"  # Reddit API allows 'me' for current user
-            except Exception:
-                username = "me"  # Fallback to 'me'
+        driver = None
+        try:
+            console.print("[blue]🔐 Initializing undetected Chrome browser...[/blue]")
+            options = uc.ChromeOptions()
+            # Remove headless mode to better mimic real user
+            # options.add_argument('--headless')
+            options.add_argument('--no-sandbox')
+            options.add_argument('--disable-dev-shm-usage')
+            options.add_argument('--disable-gpu')
+            options.add_argument('--window-size=1920,1080')
+            options.add_argument('--disable-blink-features=AutomationControlled')
+            options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            options.add_experimental_option('useAutomationExtension', False)
+            options.add_argument('--disable-extensions')
+            options.add_argument('--profile-directory=Default')
+            options.add_argument('--user-data-dir=/tmp/chrome_dev_test')
+            options.add_argument('--disable-plugins-discovery')
+            options.add_argument('--start-maximized')
+            
+            driver = uc.Chrome(options=options, version_main=None)
+            
+            # Execute stealth scripts to hide automation
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            driver.execute_script("Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]})")
+            driver.execute_script("Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']})")
+            
+            # Set cookies in the browser
+            driver.get('https://www.reddit.com')
+            for name, value in cookies.items():
+                driver.add_cookie({'name': name, 'value': value, 'domain': '.reddit.com'})
+            
+            console.print("[green]✓ Undetected Chrome browser initialized successfully[/green]")
+            time.sleep(3)  # Longer delay to appear more human
+            return driver
+            
+        except Exception as e:
+            console.print(f"[yellow]⚠️ Undetected Chrome failed: {e}[/yellow]")
+            if driver:
+                driver.quit()
+            return None
+    
+    @staticmethod
+    def _fetch_page_with_driver(driver, username: str, url: str, after: str):
+        """Load one saved.json page through Chrome, returning the listing or None when blocked"""
+        By = load_selenium()[1]
+        
+        # First navigate to the regular saved posts page to establish session
+        saved_page_url = f"https://www.reddit.com/user/{username}/saved"
+        if after:
+            saved_page_url += f"?after={after}"
+        
+        driver.get(saved_page_url)
+        time.sleep(3)  # Wait for page to load
+        
+        # Check if we're blocked
+        page_source = driver.page_source
+        if "403" in page_source or "blocked" in page_source.lower() or "cloudflare" in page_source.lower():
+            console.print(f"[red]❌ Blocked by Cloudflare (Selenium)[/red]")
+            return None
+        
+        # Now try to get the JSON endpoint
+        driver.get(url)
+        time.sleep(2)  # Wait for JSON to load
         
-        if not username:
-            console.print("[red]❌ Could not extract username from cookies[/red]")
+        # Get page source and parse JSON
+        page_source = driver.page_source
+        if "403" in page_source or "blocked" in page_source.lower():
+            console.print(f"[red]❌ JSON endpoint blocked by Cloudflare[/red]")
+            return None
+        
+        # Chrome renders JSON responses as plain text inside a single <pre>,
+        # which also avoids the HTML escaping present in page_source
+        pre_elements = driver.find_elements(By.TAG_NAME, 'pre')
+        if not pre_elements:
+            console.print(f"[red]❌ Could not extract JSON from page[/red]")
+            return None
+        try:
+            return json_loads(pre_elements[0].text)
+        except json.JSONDecodeError as e:
+            console.print(f"[red]❌ JSON decode error: {e}[/red]")
+            return None
+    
+    async def fetch_saved_posts_from_reddit(self, cookies: Dict[str, str]) -> dict:
+        """Fetch saved posts from Reddit API with pagination using cloudscraper to bypass Cloudflare"""
+        # The session cookie identifies the account; the API accepts 'me' for the current user
+        if not cookies.get('reddit_session'):
+            console.print("[red]❌ No reddit_session cookie found[/red]")
             return None
+        username = "me"
         
         all_posts = []
         seen_post_ids = set()
@@ -175,93 +436,13 @@ class RedditMediaDownloader:
         consecutive_duplicates = 0
         max_consecutive_duplicates = 3
         
-        # Try undetected-chromedriver first, fallback to cloudscraper
+        # cloudscraper is in-process and fast; a Chrome instance costs seconds to start and
+        # several seconds per page, so it is only launched once Cloudflare blocks cloudscraper.
+        # Both are blocking libraries, so their calls run in the executor
+        loop = asyncio.get_event_loop()
+        scraper = await loop.run_in_executor(None, self._create_scraper, cookies)
         driver = None
-        scraper = None
-        
-        if SELENIUM_AVAILABLE:
-            try:
-                console.print("[blue]🔐 Initializing undetected Chrome browser...[/blue]")
-                options = uc.ChromeOptions()
-                # Remove headless mode to better mimic real user
-                # options.add_argument('--headless')
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                options.add_argument('--disable-gpu')
-                options.add_argument('--window-size=1920,1080')
-                options.add_argument('--disable-blink-features=AutomationControlled')
-                options.add_experimental_option("excludeSwitches", ["enable-automation"])
-                options.add_experimental_option('useAutomationExtension', False)
-                options.add_argument('--disable-extensions')
-                options.add_argument('--profile-directory=Default')
-                options.add_argument('--user-data-dir=/tmp/chrome_dev_test')
-                options.add_argument('--disable-plugins-discovery')
-                options.add_argument('--start-maximized')
-                
-                driver = uc.Chrome(options=options, version_main=None)
-                
-                # Execute stealth scripts to hide automation
-                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                driver.execute_script("Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]})")
-                driver.execute_script("Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']})")
-                
-                # Set cookies in the browser
-                driver.get('https://www.reddit.com')
-                for name, value in parsed_cookies.items():
-                    driver.add_cookie({'name': name, 'value': value, 'domain': '.reddit.com'})
-                
-                console.print("[green]✓ Undetected Chrome browser initialized successfully[/green]")
-                time.sleep(3)  # Longer delay to appear more human
-                
-            except Exception as e:
-                console.print(f"[yellow]⚠️ Undetected Chrome failed, falling back to cloudscraper: {e}[/yellow]")
-                if driver:
-                    driver.quit()
-                driver = None
-        
-        if not driver:
-            # Fallback to cloudscraper
-            console.print("[blue]🔐 Using cloudscraper as fallback...[/blue]")
-            scraper = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'windows',
-                    'desktop': True
-                }
-            )
-            
-            # Set enhanced headers to mimic real browser
-            scraper.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-                'Cache-Control': 'max-age=0',
-                'Referer': 'https://www.reddit.com/'
-            })
-            
-            # Set cookies on the scraper session
-            for name, value in parsed_cookies.items():
-                scraper.cookies.set(name, value)
-            
-            # Make an initial request to establish session
-            try:
-                initial_response = scraper.get('https://www.reddit.com/')
-                if initial_response.status_code == 200:
-                    console.print("[green]✓ Cloudscraper session established[/green]")
-                else:
-                    console.print(f"[yellow]⚠️ Initial request returned {initial_response.status_code}[/yellow]")
-            except Exception as e:
-                console.print(f"[yellow]⚠️ Initial session setup failed: {e}[/yellow]")
-            
-            time.sleep(2)
+        await asyncio.sleep(2)
         
         while True:
             # Construct URL
@@ -271,57 +452,30 @@ class RedditMediaDownloader:
             
             console.print(f"[dim]Fetching: {url}[/dim]")
             
-            # Make request using either selenium or cloudscraper
+            # Make request using either cloudscraper or selenium
             try:
                 if driver:
-                    # Use selenium undetected chromedriver
-                    # First navigate to the regular saved posts page to establish session
-                    saved_page_url = f"https://www.reddit.com/user/{username}/saved"
-                    if after:
-                        saved_page_url += f"?after={after}"
-                    
-                    driver.get(saved_page_url)
-                    time.sleep(3)  # Wait for page to load
-                    
-                    # Check if we're blocked
-                    page_source = driver.page_source
-                    if "403" in page_source or "blocked" in page_source.lower() or "cloudflare" in page_source.lower():
-                        console.print(f"[red]❌ Blocked by Cloudflare (Selenium)[/red]")
-                        break
-                    
-                    # Now try to get the JSON endpoint
-                    driver.get(url)
-                    time.sleep(2)  # Wait for JSON to load
-                    
-                    # Get page source and parse JSON
-                    page_source = driver.page_source
-                    if "403" in page_source or "blocked" in page_source.lower():
-                        console.print(f"[red]❌ JSON endpoint blocked by Cloudflare[/red]")
-                        break
-                    
-                    # Extract JSON from page source
-                    try:
-                        # Find JSON data in page source
-                        json_start = page_source.find('{')
-                        json_end = page_source.rfind('}') + 1
-                        if json_start != -1 and json_end > json_start:
-                            json_str = page_source[json_start:json_end]
-                            data = json.loads(json_str)
-                        else:
-                            console.print(f"[red]❌ Could not extract JSON from page[/red]")
-                            break
-                    except json.JSONDecodeError as e:
-                        console.print(f"[red]❌ JSON decode error: {e}[/red]")
+                    data = await loop.run_in_executor(
+                        None, self._fetch_page_with_driver, driver, username, url, after
+                    )
+                    if data is None:
                         break
                 else:
-                    # Use cloudscraper
-                    response = scraper.get(url)
+                    response = await loop.run_in_executor(None, scraper.get, url)
+                    
+                    if response.status_code in (403, 503) and load_selenium():
+                        # Cloudflare challenge: retry this page with a real browser
+                        console.print(f"[yellow]⚠️ Cloudscraper blocked (HTTP {response.status_code}), switching to undetected Chrome...[/yellow]")
+                        driver = await loop.run_in_executor(None, self._create_chrome_driver, cookies)
+                        if driver:
+                            continue
                     
                     if response.status_code != 200:
                         console.print(f"[red]❌ HTTP {response.status_code}: {response.text[:200]}[/red]")
                         break
                     
-                    data = response.json()
+                    # Parse the raw bytes directly; skips requests' text decode and uses orjson when present
+                    data = json_loads(response.content)
                 
                 if not data or 'data' not in data or 'children' not in data['data']:
                     console.print("[yellow]⚠️ No more posts found[/yellow]")
@@ -334,18 +488,12 @@ class RedditMediaDownloader:
                     break
                 
                 # Check for duplicates
-                new_posts = []
-                duplicate_count = 0
+                page_ids = {post['data']['id'] for post in posts}
+                new_ids = page_ids - seen_post_ids
+                seen_post_ids |= page_ids
+                new_posts = [post for post in posts if post['data']['id'] in new_ids]
                 
-                for post in posts:
-                    post_id = post['data']['id']
-                    if post_id in seen_post_ids:
-                        duplicate_count += 1
-                    else:
-                        seen_post_ids.add(post_id)
-                        new_posts.append(post)
-                
-                if duplicate_count == len(posts):
+                if not new_ids:
                     consecutive_duplicates += 1
                     console.print(f"[yellow]⚠️ All {len(posts)} posts are duplicates (consecutive: {consecutive_duplicates})[/yellow]")
                     if consecutive_duplicates >= max_consecutive_duplicates:
@@ -363,7 +511,7 @@ class RedditMediaDownloader:
                     break
                     
                 # Small delay to be respectful
-                time.sleep(1)
+                await asyncio.sleep(1)
                         
             except Exception as e:
                 console.print(f"[red]❌ Error fetching posts: {str(e)}[/red]")
@@ -390,8 +538,8 @@ class RedditMediaDownloader:
             # Save to file
             saved_file_path = os.path.join(os.getcwd(), 'saved.json')
             try:
-                with open(saved_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
+                with open(saved_file_path, 'wb') as f:
+                    f.write(json_dumps(result))
                 console.print(f"[green]✓ Saved {len(all_posts)} posts to {saved_file_path}[/green]")
             except Exception as e:
                 console.print(f"[yellow]⚠️ Could not save to file: {str(e)}[/yellow]")
@@ -401,14 +549,30 @@ class RedditMediaDownloader:
             console.print("[red]❌ No posts fetched[/red]")
             return None
 
+    # Filename formatters, one per --style; __init__ binds the selected one
+    @staticmethod
+    def _basic_filename(title: str, post_id: str, url: str, ext: str) -> str:
+        return f"{title} --- {post_id}{ext}"
+
+    @staticmethod
+    def _pretty_filename(title: str, post_id: str, url: str, ext: str) -> str:
+        return f"{title}{ext}"
+
+    @staticmethod
+    def _advanced_filename(title: str, post_id: str, url: str, ext: str) -> str:
+        url_hash = hashlib.blake2b(url.encode('utf-8'), digest_size=4).hexdigest()
+        return f"{title}-{post_id}-{url_hash}{ext}"
+
+    @staticmethod
+    def _url_filename(title: str, post_id: str, url: str, ext: str) -> str:
+        return os.path.basename(urlparse(url).path)
+
     def _generate_filename(self, post_data: Dict[str, Any], url: str) -> str:
-        parsed_url = urlparse(url)
-        original_filename = os.path.basename(parsed_url.path)
-        file_ext = os.path.splitext(original_filename)[1].lower()
+        _, file_ext, kind = self._classify_url(url)
         
         # Ensure file has a valid extension
         if not file_ext:
-            if 'redgifs.com' in url:
+            if kind == 'redgifs':
                 file_ext = '.mp4'
             elif post_data.get('is_video', False):
                 file_ext = '.mp4'
@@ -419,212 +583,422 @@ class RedditMediaDownloader:
         post_title = post_data.get('title', '').strip()
         post_id = post_data.get('id', '')
 
-        clean_title = ''.join(c if c.isalnum() or c in '-_' else '_' for c in post_title)
-        clean_title = clean_title[:50]
-
-        if self.filename_style == 'basic':
-            filename = f"{clean_title} --- {post_id}{file_ext}"
-        elif self.filename_style == 'pretty':
-            filename = f"{clean_title}{file_ext}"
-        elif self.filename_style == 'advanced':
-            import hashlib
-            url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-            filename = f"{clean_title}-{post_id}-{url_hash}{file_ext}"
-        else:
-            filename = original_filename
+        # Substitution is 1:1 per character, so truncating first gives the same result
+        clean_title = self._FILENAME_UNSAFE_RE.sub('_', post_title[:50])
 
+        filename = self._format_filename(clean_title, post_id, url, file_ext)
         return os.path.join(self.output_dir, filename) if file_ext else ''
 
     def _file_exists_and_valid(self, filepath):
         """Check if file exists and has valid size (not empty or corrupted)"""
-        if not os.path.exists(filepath):
+        # Sizes come from _scan_output_dir instead of a stat per file
+        file_size = self._existing_files.get(os.path.basename(filepath))
+        if file_size is None:
             return False
         
         # Check if file size is reasonable (> 1KB for most media files)
+        if file_size < 1024:  # Less than 1KB might be corrupted
+            logging.debug(f"File {filepath} exists but is too small ({file_size} bytes), will re-download")
+            return False
+        return True
+
+    @staticmethod
+    def _existing_nonempty(path: str) -> bool:
+        """Check that a file exists and is not empty with a single stat call"""
         try:
-            file_size = os.path.getsize(filepath)
-            if file_size < 1024:  # Less than 1KB might be corrupted
-                logging.debug(f"File {filepath} exists but is too small ({file_size} bytes), will re-download")
-                return False
-            return True
+            return os.stat(path).st_size > 0
         except OSError:
             return False
 
-    async def _download_file_with_retry(self, url: str, filename: str, task_id, retry_count: int = 0) -> bool:
-        """Download file with retry logic and exponential backoff"""
-        if url in self.processed_urls:
-            logging.info(f"⏩ Already processed: {os.path.basename(filename)}")
-            self.progress.update(task_id, advance=1)
+    def _flush_progress(self):
+        if self._progress_pending:
+            self.progress.update(self._progress_task, advance=self._progress_pending)
+            self._progress_pending = 0
+
+    async def _progress_flusher(self):
+        """Apply finished downloads to the progress bar on a timer"""
+        # Rich's lock is taken a couple of times per second instead of once per download
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._flush_progress()
+
+    def _open_part_file(self, length: int):
+        """Create a unique .part file in the output directory, preallocated when the size is known"""
+        # Same directory keeps os.replace on one filesystem, and colliding filenames never share
+        # a temp file. Not mkstemp: its 0600 mode would survive os.replace; 0o666 lets umask apply
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        while True:
+            temp_filename = os.path.join(self.output_dir, f"tmp{os.urandom(4).hex()}.part")
+            try:
+                fd = os.open(temp_filename, flags, 0o666)
+                break
+            except FileExistsError:
+                continue
+        if length and hasattr(os, 'posix_fallocate'):  # Lets the filesystem allocate extents once
+            try:
+                os.posix_fallocate(fd, 0, length)
+            except OSError as e:  # Not supported by every filesystem
+                logging.debug(f"Could not preallocate {length} bytes: {e}")
+        return os.fdopen(fd, 'wb'), temp_filename
+
+    @staticmethod
+    def _finish_part_file(f, data, written: int, temp_filename: str, filename: str):
+        """Write the last buffered bytes, close the .part file and atomically move it into place"""
+        with f:
+            if data:
+                f.write(data)
+            f.truncate(written)  # Drop preallocated space the body did not fill
+        os.replace(temp_filename, filename)
+
+    @staticmethod
+    def _parse_retry_after(value: str):
+        """Return the delay in seconds from a Retry-After header (seconds or HTTP date), or None"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    async def _wait_for_rate_limit(self, host: str):
+        """Hold a request back while its host is rate limiting us"""
+        # One 429 pauses every worker instead of each one discovering it on its own
+        remaining = self._rate_limited_until.get(host, 0) - asyncio.get_event_loop().time()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def _note_rate_limit(self, host: str, delay: float):
+        until = asyncio.get_event_loop().time() + delay
+        if until > self._rate_limited_until.get(host, 0):
+            self._rate_limited_until[host] = until
+
+    def _backoff_delay(self, previous: float) -> float:
+        """Return the next retry delay using decorrelated jitter, capped at 60s"""
+        # Random point in [base_delay, 3 * previous]: unlike fixed exponential steps, workers
+        # that hit a 429 together don't retry in lockstep
+        return min(60.0, random.uniform(self.base_delay, max(previous, self.base_delay) * 3))
+
+    @classmethod
+    def _retry_after_from_error(cls, error):
+        """Return the Retry-After delay of the HTTP error behind a yt-dlp DownloadError, or None"""
+        cause = (getattr(error, 'exc_info', None) or (None, None))[1]
+        # Extractor errors wrap the HTTP error in .cause; urllib's HTTPError carries .headers,
+        # yt-dlp's own networking HTTPError carries .response.headers
+        for _ in range(3):
+            if cause is None:
+                return None
+            headers = getattr(cause, 'headers', None) or getattr(getattr(cause, 'response', None), 'headers', None)
+            if headers is not None:
+                return cls._parse_retry_after(headers.get('Retry-After'))
+            cause = getattr(cause, 'cause', None)
+        return None
+
+    async def _download_file_with_retry(self, url: str, filename: str) -> bool:
+        """Download file with retry logic and jittered backoff"""
+        name = os.path.basename(filename)
+        if self._is_url_processed(url):
+            logging.info(f"⏩ Already processed: {name}")
             return True
 
         if self._file_exists_and_valid(filename):
-            self.processed_urls.add(url)
-            logging.info(f"⏩ Skipped: {os.path.basename(filename)}")
-            self.progress.update(task_id, advance=1)
+            self._mark_url_processed(url)
+            logging.info(f"⏩ Skipped: {name}")
             return True
 
-        async with self.download_semaphore:  # Control concurrent downloads
-            temp_filename = f"{filename}.tmp"
+        host = self._classify_url(url)[0]
+        delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            rate_limited = False
+            temp_filename = None
             try:
+                await self._wait_for_rate_limit(host)
                 async with self.session.get(url) as response:
                     if response.status == 200:
-                        async with aiofiles.open(temp_filename, 'wb') as f:
-                            await f.write(await response.read())
-                        os.rename(temp_filename, filename)
-                        self.processed_urls.add(url)
-                        logging.info(f"✓ Downloaded: {os.path.basename(filename)}")
-                        self.progress.update(task_id, advance=1)
+                        # Content-Length is the encoded size when the body is compressed
+                        length = None if 'Content-Encoding' in response.headers else response.content_length
+                        loop = asyncio.get_event_loop()
+                        f, temp_filename = await loop.run_in_executor(None, self._open_part_file, length)
+                        # Stream to disk so large videos never sit fully in memory. Chunks are
+                        # copied into one reusable buffer so each executor write moves ~1 MiB;
+                        # the open and the final write/close/rename are one executor hop each
+                        buffer = memoryview(bytearray(self.write_buffer_size))
+                        filled = 0
+                        written = 0
+                        try:
+                            async for chunk in response.content.iter_chunked(65536):
+                                if filled + len(chunk) > len(buffer):
+                                    await loop.run_in_executor(None, f.write, buffer[:filled])
+                                    filled = 0
+                                buffer[filled:filled + len(chunk)] = chunk
+                                filled += len(chunk)
+                                written += len(chunk)
+                            await loop.run_in_executor(
+                                None, self._finish_part_file, f, buffer[:filled], written, temp_filename, filename
+                            )
+                        except BaseException:
+                            f.close()
+                            raise
+                        self._existing_files[name] = written
+                        self._mark_url_processed(url)
+                        logging.info(f"✓ Downloaded: {name}")
                         return True
-                    elif response.status == 429:  # Rate limited
-                        if retry_count < self.max_retries:
-                            delay = self.base_delay * (2 ** retry_count) + random.uniform(0, 1)
-                            logging.warning(f"⏳ Rate limited, retrying in {delay:.1f}s: {os.path.basename(filename)} (attempt {retry_count + 1}/{self.max_retries})")
-                            await asyncio.sleep(delay)
-                            return await self._download_file_with_retry(url, filename, task_id, retry_count + 1)
-                        else:
-                            logging.error(f"✗ Failed after {self.max_retries} retries: {os.path.basename(filename)} (Status 429)")
-                            self.progress.update(task_id, advance=1)
-                            return False
-                    else:
-                        logging.error(f"✗ Failed: {os.path.basename(filename)} (Status {response.status})")
-                        self.progress.update(task_id, advance=1)
+                    elif response.status != 429:
+                        logging.error(f"✗ Failed: {name} (Status {response.status})")
                         return False
+                    # Rate limited: prefer the server's own hint over blind backoff
+                    retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                    rate_limited = True
+                    reason = "Rate limited"
+                    failure = "Status 429"
             except Exception as e:
-                if retry_count < self.max_retries:
-                    delay = self.base_delay * (2 ** retry_count) + random.uniform(0, 1)
-                    logging.warning(f"⏳ Error, retrying in {delay:.1f}s: {os.path.basename(filename)} - {str(e)} (attempt {retry_count + 1}/{self.max_retries})")
-                    await asyncio.sleep(delay)
-                    return await self._download_file_with_retry(url, filename, task_id, retry_count + 1)
-                else:
-                    logging.error(f"✗ Error after {self.max_retries} retries: {os.path.basename(filename)} ({str(e)})")
-                    self.progress.update(task_id, advance=1)
-                    return False
+                reason = f"Error ({str(e)})"
+                failure = str(e)
+                if temp_filename:
+                    try:
+                        os.remove(temp_filename)
+                    except OSError:
+                        pass
+            
+            if attempt == self.max_retries:
+                break
+            if retry_after is not None:
+                delay = min(retry_after, 60.0)
+            else:
+                delay = self._backoff_delay(delay)
+            if rate_limited:
+                self._note_rate_limit(host, delay)
+            logging.warning(f"⏳ {reason}, retrying in {delay:.1f}s: {name} (attempt {attempt + 1}/{self.max_retries})")
+            # Sleep after the response is released so the connection returns to the pool
+            await asyncio.sleep(delay)
+        
+        logging.error(f"✗ Failed after {self.max_retries} retries: {name} ({failure})")
+        return False
 
-    async def _download_file(self, url: str, filename: str, task_id) -> bool:
+    async def _download_file(self, url: str, filename: str) -> bool:
         """Wrapper for download with retry logic"""
-        return await self._download_file_with_retry(url, filename, task_id)
+        return await self._download_file_with_retry(url, filename)
 
-    def _cleanup_incomplete_downloads(self):
-        for filename in os.listdir(self.output_dir):
-            filepath = os.path.join(self.output_dir, filename)
-            if os.path.isfile(filepath) and os.path.getsize(filepath) == 0:
-                try:
-                    os.remove(filepath)
-                    logging.info(f"🧹 Cleaned up incomplete download: {filename}")
-                except Exception as e:
-                    logging.error(f"Failed to clean up {filename}: {str(e)}")
+    def _scan_output_dir(self) -> dict:
+        """Collect sizes of downloaded files, removing empty files and our own .part leftovers"""
+        existing = {}
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False) or entry.name.startswith('.processed'):
+                    continue  # Never touch the state database or its WAL files
+                file_size = entry.stat(follow_symlinks=False).st_size
+                # Only our own tmp*.part names: yt-dlp keeps resumable <video>.part files here too
+                if file_size == 0 or (entry.name.startswith('tmp') and entry.name.endswith('.part')):
+                    try:
+                        os.remove(entry.path)
+                        logging.info(f"🧹 Cleaned up incomplete download: {entry.name}")
+                    except Exception as e:
+                        logging.error(f"Failed to clean up {entry.name}: {str(e)}")
+                else:
+                    existing[entry.name] = file_size
+        return existing
 
-    def _load_processed_posts(self) -> set:
-        """Load previously processed post IDs from file"""
-        processed_file = os.path.join(self.output_dir, '.processed_posts.json')
-        if os.path.exists(processed_file):
+    def _open_state_db(self) -> sqlite3.Connection:
+        """Open the processed posts/URLs database, importing the old JSON state file once"""
+        db = sqlite3.connect(os.path.join(self.output_dir, '.processed.db'))
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('CREATE TABLE IF NOT EXISTS processed_posts (id TEXT PRIMARY KEY)')
+        db.execute('CREATE TABLE IF NOT EXISTS processed_urls (url TEXT PRIMARY KEY)')
+        db.commit()
+        
+        legacy_file = os.path.join(self.output_dir, '.processed_posts.json')
+        if os.path.exists(legacy_file):
             try:
-                with open(processed_file, 'r') as f:
-                    return set(json.load(f))
+                with open(legacy_file, 'r') as f:
+                    db.executemany('INSERT OR IGNORE INTO processed_posts (id) VALUES (?)',
+                                   ((post_id,) for post_id in json.load(f)))
+                db.commit()
+                os.replace(legacy_file, f"{legacy_file}.bak")
+                logging.info("📦 Imported processed posts from .processed_posts.json")
             except Exception as e:
-                logging.warning(f"Could not load processed posts file: {e}")
-        return set()
+                logging.warning(f"Could not import processed posts file: {e}")
+        return db
     
-    def _save_processed_posts(self):
-        """Save processed post IDs to file"""
-        processed_file = os.path.join(self.output_dir, '.processed_posts.json')
+    def _is_post_processed(self, post_id: str) -> bool:
+        return self.db.execute('SELECT 1 FROM processed_posts WHERE id = ?', (post_id,)).fetchone() is not None
+    
+    @classmethod
+    def _canonical_url(cls, url: str) -> str:
+        """Normalize a URL into a dedup key so size/tracking variants of the same media match"""
+        # Only used for bookkeeping, downloads still request the original URL
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc.lower()
+        if (scheme, netloc.rpartition(':')[2]) in (('http', '80'), ('https', '443')):
+            netloc = netloc.rpartition(':')[0]
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in cls._IGNORED_QUERY_PARAMS and not key.startswith('utm_')
+        ))
+        return urlunsplit((scheme, netloc, parts.path, query, ''))
+    
+    def _is_url_processed(self, url: str) -> bool:
+        return self.db.execute('SELECT 1 FROM processed_urls WHERE url = ?',
+                               (self._canonical_url(url),)).fetchone() is not None
+    
+    def _mark_url_processed(self, url: str):
+        # Committed immediately so finished downloads survive a crash mid-run
+        self.db.execute('INSERT OR IGNORE INTO processed_urls (url) VALUES (?)', (self._canonical_url(url),))
+        self.db.commit()
+    
+    def _save_processed_posts(self, post_ids):
+        """Record processed post IDs in the state database"""
         try:
-            with open(processed_file, 'w') as f:
-                json.dump(list(self.processed_posts), f)
-        except Exception as e:
-            logging.warning(f"Could not save processed posts file: {e}")
+            self.db.executemany('INSERT OR IGNORE INTO processed_posts (id) VALUES (?)',
+                                ((post_id,) for post_id in post_ids))
+            self.db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Could not save processed posts: {e}")
     
-    async def process_posts(self, saved_data):
-        os.makedirs(self.output_dir, exist_ok=True)
-        
-        # Load previously processed posts
-        self.processed_posts = self._load_processed_posts()
+    async def process_posts(self, posts):
+        self._existing_files = await asyncio.get_event_loop().run_in_executor(None, self._scan_output_dir)
         
-        tasks = []
-        total_urls = 0
         new_posts_count = 0
         skipped_posts_count = 0
+        existing_files_count = 0
         
-        # Handle both list and dict formats for saved_data
-        if isinstance(saved_data, list):
-            posts = saved_data
-        elif isinstance(saved_data, dict):
-            posts = saved_data.get('data', {}).get('children', [])
-        else:
-            logging.error("Invalid saved_data format. Expected list or dict.")
-            return
-        
-        # Get posts in reverse order (newest first)
-        posts.reverse()
-        
-        # Filter out already processed posts and count URLs
-        filtered_posts = []
-        for post in posts:
+        # Single pass: filter already processed posts and collect (url, filename) pairs,
+        # dropping URLs that are already scheduled so duplicates never become tasks
+        downloads = []
+        seen_urls = set()
+        new_post_ids = set()
+        for post in reversed(posts):  # Newest first, without mutating the caller's list
             if 'data' in post:
                 post_data = post['data']
                 post_id = post_data.get('id')
                 
-                if post_id in self.processed_posts:
+                if post_id in new_post_ids or self._is_post_processed(post_id):
                     skipped_posts_count += 1
                     continue
                 
                 urls = self._get_media_urls(post_data)
-                if urls:  # Only process posts with media
-                    filtered_posts.append(post)
-                    total_urls += len(urls)
-                    new_posts_count += 1
-                    self.processed_posts.add(post_id)  # Mark as processed
+                if not urls:  # Only process posts with media
+                    continue
+                
+                new_posts_count += 1
+                new_post_ids.add(post_id)  # Mark as processed
+                
+                for idx, url in enumerate(urls):
+                    url_key = self._canonical_url(url)
+                    if url_key in seen_urls or self._is_url_processed(url):
+                        continue
+                    seen_urls.add(url_key)
+                    
+                    base_filename = self._generate_filename(post_data, url)
+                    if not base_filename:  # No usable extension
+                        continue
+                    
+                    if len(urls) > 1:
+                        name, ext = os.path.splitext(base_filename)
+                        filename = f"{name}_{idx + 1}{ext}"
+                    else:
+                        filename = base_filename
+                    
+                    if self._file_exists_and_valid(filename):
+                        self._mark_url_processed(url)
+                        existing_files_count += 1
+                        continue
+                    downloads.append((url, filename))
         
         if skipped_posts_count > 0:
             logging.info(f"⏩ Skipped {skipped_posts_count} already processed posts")
+        if existing_files_count > 0:
+            logging.info(f"⏩ Skipped {existing_files_count} files already in {self.output_dir}")
         
         if new_posts_count == 0:
             logging.info("ℹ️ No new posts with media to download")
             return
         
-        logging.info(f"📥 Processing {new_posts_count} new posts with {total_urls} media files")
+        # Import yt-dlp once and off the event loop (it takes hundreds of ms) before any worker needs it
+        if any(self._classify_url(url)[2] == 'reddit_video' for url, _ in downloads):
+            if not await asyncio.get_event_loop().run_in_executor(None, load_yt_dlp):
+                video_count = len(downloads)
+                downloads = [(url, filename) for url, filename in downloads if self._classify_url(url)[2] != 'reddit_video']
+                logging.error(f"✗ yt-dlp is not installed, skipping {video_count - len(downloads)} Reddit videos (pip install yt-dlp)")
+        
+        logging.info(f"📥 Processing {new_posts_count} new posts with {len(downloads)} media files")
         
         with self.progress:
-            task_id = self.progress.add_task("[dim cyan]⬇️  Downloading media", total=total_urls)
+            self._progress_task = self.progress.add_task("[dim cyan]⬇️  Downloading media", total=len(downloads))
             
-            for post in filtered_posts:
-                if 'data' in post:
-                    post_data = post['data']
-                    urls = self._get_media_urls(post_data)
-                    
-                    for idx, url in enumerate(urls):
-                        if url not in self.processed_urls:  # Skip already processed URLs
-                            base_filename = self._generate_filename(post_data, url)
-                            name, ext = os.path.splitext(base_filename)
-                            
-                            if len(urls) > 1:
-                                filename = f"{name}_{idx + 1}{ext}"
-                            else:
-                                filename = base_filename
-                            
-                            if 'redgifs.com' in url:
-                                tasks.append(self._download_redgifs_video(url, filename, task_id))
-                            elif 'v.redd.it' in url:
-                                tasks.append(self._download_reddit_video(url, filename, task_id))
-                            else:
-                                tasks.append(self._download_file(url, filename, task_id))
+            # A fixed pool of workers pulls from the queue, so the number of live
+            # coroutines scales with max_concurrent instead of with the URL count
+            jobs = asyncio.Queue()
+            for url, filename in downloads:
+                jobs.put_nowait((url, filename))
+            
+            async def worker():
+                while True:
+                    try:
+                        url, filename = jobs.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    try:
+                        await self._download_one(url, filename)
+                    except Exception as e:
+                        # Keep this worker (and the rest of the batch) going; the downloaders
+                        # handle their own errors, so this only catches unexpected failures
+                        logging.error(f"✗ Unexpected error: {os.path.basename(filename)} ({e})")
+                    # Every job counts once, whether it downloaded, skipped or failed
+                    self._progress_pending += 1
             
-            # Process all downloads concurrently with semaphore control
-            await asyncio.gather(*tasks)
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrent)]
+            flusher = asyncio.create_task(self._progress_flusher())
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                # Same structured semantics as asyncio.TaskGroup (3.11+): if we are cancelled
+                # or interrupted, stop the remaining workers before propagating
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            finally:
+                flusher.cancel()
+                self._flush_progress()
             
-            # Save processed posts to file
-            self._save_processed_posts()
+            # Save processed posts to the state database
+            self._save_processed_posts(new_post_ids)
 
-    async def _get_redgifs_token(self) -> str:
-        async with self.session.get('https://api.redgifs.com/v2/auth/temporary') as response:
-            if response.status == 200:
-                data = await response.json()
-                return data.get('token')
-            raise Exception(f"Failed to get RedGifs token: Status {response.status}")
+    async def _download_one(self, url: str, filename: str) -> bool:
+        """Dispatch a URL to the downloader for its host"""
+        kind = self._classify_url(url)[2]
+        if kind == 'redgifs':
+            return await self._download_redgifs_video(url, filename)
+        if kind == 'reddit_video':
+            return await self._download_reddit_video(url, filename)
+        return await self._download_file(url, filename)
+
+    async def _get_redgifs_token(self, stale_token: str = None) -> str:
+        """Return the cached RedGifs token, refreshing it when missing, expired or rejected"""
+        async with self._redgifs_token_lock:  # Only one coroutine fetches on cold start
+            if (self._redgifs_token and self._redgifs_token != stale_token
+                    and time.time() < self._redgifs_token_expiry):
+                return self._redgifs_token
+            async with self.session.get('https://api.redgifs.com/v2/auth/temporary') as response:
+                if response.status == 200:
+                    data = await response.json()
+                    self._redgifs_token = data.get('token')
+                    self._redgifs_token_expiry = time.time() + 23 * 60 * 60  # Tokens last ~24h
+                    return self._redgifs_token
+                raise Exception(f"Failed to get RedGifs token: Status {response.status}")
 
     async def _get_redgifs_video_url(self, gif_id: str, token: str) -> str:
+        """Return the video URL for gif_id, or None if the token was rejected"""
         headers = {'Authorization': f'Bearer {token}'}
         async with self.session.get(f'https://api.redgifs.com/v2/gifs/{gif_id}', headers=headers) as response:
+            if response.status == 401:
+                return None
             if response.status == 200:
                 data = await response.json()
                 urls = data.get('gif', {}).get('urls', {})
@@ -634,140 +1008,121 @@ class RedditMediaDownloader:
                         return url
             raise Exception(f"Failed to get RedGifs video URL: Status {response.status}")
 
-    def _extract_redgifs_id(self, url: str) -> str:
-        # Handle various RedGifs URL formats
-        parsed = urlparse(url)
-        path = parsed.path.rstrip('/')
-        
-        # Handle watch URLs: /watch/gifname
-        if '/watch/' in path:
-            gif_id = path.split('/watch/')[-1].split('/')[0]
-        # Handle direct URLs: /gifname or /ifr/gifname
-        elif '/ifr/' in path:
-            gif_id = path.split('/ifr/')[-1].split('/')[0]
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _extract_redgifs_id(url: str) -> str:
+        # Handle /watch/gifname, /ifr/gifname and direct /gifname URLs
+        path = urlparse(url).path.rstrip('/')  # Query string is already excluded
+        for marker in ('/watch/', '/ifr/'):
+            if marker in path:
+                gif_id = path.rpartition(marker)[2].partition('/')[0]
+                break
         else:
-            # Extract last path component
-            gif_id = path.split('/')[-1]
+            gif_id = path.rsplit('/', 1)[-1]
         
-        # Remove any file extensions or query parameters
-        gif_id = gif_id.split('.')[0].split('?')[0]
+        # Remove any file extension
+        gif_id = gif_id.partition('.')[0]
         
         if not gif_id:
             raise ValueError(f"Could not extract RedGifs ID from URL: {url}")
         
         return gif_id
 
-    async def _download_redgifs_video(self, url: str, filename: str, task_id) -> bool:
+    async def _download_redgifs_video(self, url: str, filename: str) -> bool:
         try:
             gif_id = self._extract_redgifs_id(url)
             token = await self._get_redgifs_token()
             video_url = await self._get_redgifs_video_url(gif_id, token)
+            if video_url is None:  # Cached token was rejected, refresh it once
+                token = await self._get_redgifs_token(stale_token=token)
+                video_url = await self._get_redgifs_video_url(gif_id, token)
+                if video_url is None:
+                    raise Exception("RedGifs rejected a freshly issued token")
             if video_url:
-                return await self._download_file(video_url, filename, task_id)
+                return await self._download_file(video_url, filename)
             return False
         except Exception as e:
             logging.error(f"✗ RedGifs Error: {os.path.basename(filename)} ({str(e)})")
-            self.progress.update(task_id, advance=1)
             return False
 
-    async def _download_reddit_video_with_retry(self, url: str, filename: str, task_id, retry_count: int = 0) -> bool:
+    async def _download_reddit_video_with_retry(self, url: str, filename: str) -> bool:
         """Download Reddit video using yt-dlp with format fallback and retry logic"""
+        yt_dlp = load_yt_dlp()  # Already imported by process_posts
+        
         filepath = os.path.join(self.output_dir, filename)
+        name = os.path.basename(filename)
         
-        # Check if already exists
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-            logging.info(f"⏩ Skipped: {os.path.basename(filename)}")
-            self.progress.update(task_id, advance=1)
+        # Check if already exists, against the directory scan rather than another stat
+        if self._existing_files.get(name):
+            logging.info(f"⏩ Skipped: {name}")
             return True
         
-        # Define format options in order of preference
-        format_options = [
-            'best[height<=720]/best',  # Prefer 720p or lower
-            'best[height<=480]/best',  # Fallback to 480p
-            'worst/best',              # Fallback to worst quality
-            'best',                    # Final fallback
-        ]
+        # 720p or lower, falling back to whatever is best. yt-dlp resolves the fallback against
+        # the formats it already extracted, so the DASH manifest is fetched once
+        format_selector = 'best[height<=720]/best'
         
-        for format_idx, format_selector in enumerate(format_options):
-            try:
-                # Configure yt-dlp options
-                # Configure yt-dlp options with debug info
-                ydl_opts = {
-                    'outtmpl': filepath,
-                    'quiet': not logging.getLogger().isEnabledFor(logging.DEBUG),
-                    'no_warnings': not logging.getLogger().isEnabledFor(logging.DEBUG),
-                    'verbose': logging.getLogger().isEnabledFor(logging.DEBUG),
-                    'format': format_selector,
-                    'ignoreerrors': False,
-                    'extractaudio': False,
-                    'retries': 2,
-                    'fragment_retries': 2,
-                    'logger': logging.getLogger('yt-dlp'),
-                    'listformats': logging.getLogger().isEnabledFor(logging.DEBUG),  # List available formats in debug mode
-                }
-                
-                logging.debug(f"yt-dlp attempting download with format: {format_selector}")
-                logging.debug(f"yt-dlp options: {ydl_opts}")
-                
-                # Use yt-dlp to download the video
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl_opts = {**self._ydl_base_opts, 'outtmpl': filepath, 'format': format_selector}
+        logging.debug(f"yt-dlp attempting download with format: {format_selector}")
+        logging.debug(f"yt-dlp options: {ydl_opts}")
+        
+        # One YoutubeDL instance serves every attempt, keeping its opener and connections
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            host = self._classify_url(url)[0]
+            delay = self.base_delay
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                rate_limited = False
+                try:
+                    await self._wait_for_rate_limit(host)
                     await asyncio.get_event_loop().run_in_executor(
-                        None, ydl.download, [url]
+                        self._ytdlp_executor, ydl.download, [url]
                     )
-                
-                # Check if file was downloaded successfully
-                if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-                    logging.info(f"✓ Downloaded: {os.path.basename(filename)} (format: {format_selector})")
-                    self.progress.update(task_id, advance=1)
-                    return True
                     
-            except yt_dlp.DownloadError as e:
-                error_msg = str(e).lower()
-                if 'requested format is not available' in error_msg or 'no video formats found' in error_msg:
-                    if format_idx < len(format_options) - 1:
-                        logging.warning(f"⚠️ Format '{format_selector}' not available for {os.path.basename(filename)}, trying next format...")
-                        continue
-                    else:
-                        logging.error(f"✗ No available formats for: {os.path.basename(filename)}")
-                        self.progress.update(task_id, advance=1)
-                        return False
-                elif '429' in error_msg or 'rate limit' in error_msg:
-                    if retry_count < self.max_retries:
-                        delay = self.base_delay * (2 ** retry_count) + random.uniform(0, 1)
-                        logging.warning(f"⏳ Rate limited, retrying in {delay:.1f}s: {os.path.basename(filename)} (attempt {retry_count + 1}/{self.max_retries})")
-                        await asyncio.sleep(delay)
-                        return await self._download_reddit_video_with_retry(url, filename, task_id, retry_count + 1)
-                    else:
-                        logging.error(f"✗ Rate limited after {self.max_retries} retries: {os.path.basename(filename)}")
-                        self.progress.update(task_id, advance=1)
+                    # Check if file was downloaded successfully (off the event loop, the
+                    # output directory may be on a slow or network filesystem)
+                    if await asyncio.get_event_loop().run_in_executor(None, self._existing_nonempty, filepath):
+                        logging.info(f"✓ Downloaded: {name}")
+                        return True
+                    logging.error(f"✗ yt-dlp produced no file for: {name}")
+                    return False
+                    
+                except yt_dlp.DownloadError as e:
+                    error_msg = str(e).lower()
+                    if 'requested format is not available' in error_msg or 'no video formats found' in error_msg:
+                        logging.error(f"✗ No available formats for: {name}")
                         return False
-                else:
-                    logging.error(f"✗ yt-dlp error: {os.path.basename(filename)} - {str(e)}")
-                    if format_idx < len(format_options) - 1:
-                        continue
+                    elif '429' in error_msg or 'rate limit' in error_msg:
+                        retry_after = self._retry_after_from_error(e)
+                        rate_limited = True
+                        reason = "Rate limited"
+                        failure = f"Rate limited after {self.max_retries} retries: {name}"
                     else:
-                        self.progress.update(task_id, advance=1)
-                        return False
-                        
-            except Exception as e:
-                if retry_count < self.max_retries:
-                    delay = self.base_delay * (2 ** retry_count) + random.uniform(0, 1)
-                    logging.warning(f"⏳ Error, retrying in {delay:.1f}s: {os.path.basename(filename)} - {str(e)} (attempt {retry_count + 1}/{self.max_retries})")
-                    await asyncio.sleep(delay)
-                    return await self._download_reddit_video_with_retry(url, filename, task_id, retry_count + 1)
+                        # yt-dlp wraps transient 5xx, timeout and connection errors in DownloadError
+                        reason = f"yt-dlp error ({str(e)})"
+                        failure = f"yt-dlp error after {self.max_retries} retries: {name} ({str(e)})"
+                    
+                except Exception as e:
+                    reason = f"Error ({str(e)})"
+                    failure = f"Reddit Video Error after {self.max_retries} retries: {name} ({str(e)})"
+                
+                if attempt == self.max_retries:
+                    break
+                # Same policy as _download_file_with_retry: the server's hint wins over blind backoff
+                if retry_after is not None:
+                    delay = min(retry_after, 60.0)
                 else:
-                    logging.error(f"✗ Reddit Video Error after {self.max_retries} retries: {os.path.basename(filename)} ({str(e)})")
-                    self.progress.update(task_id, advance=1)
-                    return False
+                    delay = self._backoff_delay(delay)
+                if rate_limited:
+                    self._note_rate_limit(host, delay)
+                logging.warning(f"⏳ {reason}, retrying in {delay:.1f}s: {name} (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
         
-        # If we get here, all formats failed
-        logging.error(f"✗ All format options failed for: {os.path.basename(filename)}")
-        self.progress.update(task_id, advance=1)
+        logging.error(f"✗ {failure}")
         return False
 
-    async def _download_reddit_video(self, url: str, filename: str, task_id) -> bool:
+    async def _download_reddit_video(self, url: str, filename: str) -> bool:
         """Wrapper for Reddit video download with retry logic"""
-        return await self._download_reddit_video_with_retry(url, filename, task_id)
+        return await self._download_reddit_video_with_retry(url, filename)
 
 def show_help():
     console.print("\n[bold cyan]Reddit Saved Downloader[/bold cyan] 🎥")
@@ -778,6 +1133,7 @@ def show_help():
     console.print("python reddit_saved_downloader.py -r YOUR_REDDIT_SESSION -o ./downloads")
     console.print("\n[yellow]Available options:[/yellow]")
     console.print("  -i, --input           [green]Path to your saved.json file[/green]")
+    console.print("  --input-format        [green]Input file format: auto, json, or ndjson (default: auto)[/green]")
     console.print("  -r, --reddit-session  [green]Reddit session cookie (reddit_session value)[/green]")
     console.print("  -t, --token-v2        [green]Reddit token_v2 cookie (optional)[/green]")
     console.print("  -o, --output          [green]Output directory for downloads (default: ./downloads)[/green]")
@@ -801,25 +1157,108 @@ def signal_handler(sig, frame):
     console.print("\n[yellow]Received interrupt signal (Ctrl+C). Gracefully shutting down...[/yellow]")
     console.print("[dim]Press Ctrl+C again to force quit[/dim]")
     
-    # Set a timer for force quit if graceful shutdown takes too long
-    import threading
+    # Set a timer for force quit if graceful shutdown takes too long. This has to live
+    # outside the event loop: SystemExit unwinds asyncio.run(), and the hang it guards
+    # against is the loop itself waiting on executor threads (e.g. a running yt-dlp)
     def force_quit():
-        import time
-        time.sleep(5)  # Wait 5 seconds for graceful shutdown
         if shutdown_in_progress:
             console.print("\n[red]Graceful shutdown timed out. Force quitting...[/red]")
             os._exit(1)
     
-    threading.Thread(target=force_quit, daemon=True).start()
+    timer = threading.Timer(5, force_quit)  # Wait 5 seconds for graceful shutdown
+    timer.daemon = True
+    timer.start()
     sys.exit(0)
 
-def main():
+def error_exit(message: str, code: int = 1) -> NoReturn:
+    """Report a fatal error and exit"""
+    console.print(f"[red]❌ {message}[/red]")
+    raise SystemExit(code)  # Not os._exit, so the finally in run() still closes the session
+
+def saved_posts_list(saved_data):
+    """Return the list of post children from a bare list or a Reddit Listing dict"""
+    if isinstance(saved_data, list):
+        return saved_data
+    if isinstance(saved_data, dict):
+        return (saved_data.get('data') or {}).get('children') or []
+    return []
+
+def _is_ndjson(f) -> bool:
+    """Return True if the file looks like NDJSON rather than a single JSON document"""
+    # Two non-blank lines both starting with '{' can only be NDJSON: a pretty-printed
+    # Listing never starts a later line with '{'
+    heads = []
+    # Bounded reads: a compact single-line JSON export would otherwise be read whole just to peek
+    for line in iter(lambda: f.readline(1 << 20), b''):
+        if not line.endswith(b'\n') and len(line) == 1 << 20:
+            break  # no post is this long, so this is a single-line document
+        if line.strip():
+            heads.append(line.lstrip()[:1])
+            if len(heads) == 2:
+                break
+    f.seek(0)
+    return heads == [b'{', b'{']
+
+def _read_ndjson(f, path: str) -> List[Dict[str, Any]]:
+    """Parse one post per line, accepting listing children or bare post objects"""
+    posts = []
+    for lineno, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            post = json_loads(line)
+        except json.JSONDecodeError as e:
+            error_exit(f"Invalid JSON on line {lineno} of {path}: {str(e)}")
+        if not isinstance(post, dict):
+            error_exit(f"Line {lineno} of {path} is not a JSON object")
+        if 'data' not in post:
+            post = {'kind': 't3', 'data': post}
+        elif not isinstance(post['data'], dict):
+            error_exit(f"Line {lineno} of {path} has no post data")
+        posts.append(post)
+    return posts
+
+def load_saved_posts(path: str, input_format: str = 'auto'):
+    """Read and validate a saved.json (or NDJSON) export, returning its posts or exiting via error_exit"""
+    try:
+        with open(path, 'rb') as f:
+            if input_format == 'ndjson' or (input_format == 'auto' and _is_ndjson(f)):
+                saved_data = _read_ndjson(f, path)
+            elif ORJSON_AVAILABLE and os.fstat(f.fileno()).st_size:
+                # orjson parses straight out of the page cache, skipping a bytes copy of the export
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                    saved_data = json_loads(view)
+            else:
+                saved_data = json_loads(f.read())
+    except FileNotFoundError:
+        error_exit(f"File not found: {path}")
+    except json.JSONDecodeError as e:
+        error_exit(f"Invalid JSON format in {path}: {str(e)}")
+    except PermissionError:
+        error_exit(f"Permission denied accessing {path}")
+    except Exception as e:
+        error_exit(f"Error reading {path}: {str(e)}")
+        
+    # Validate saved_data content
+    if not saved_data:
+        error_exit(f"Empty file: {path}")
+    
+    posts = saved_posts_list(saved_data)
+    if not posts:
+        error_exit(f"No posts found in {path}")
+    
+    return posts
+
+def main(argv: List[str] = None):
+    """Command-line entry point; raises SystemExit on help, usage errors and bad input"""
     import signal
     signal.signal(signal.SIGINT, signal_handler)
     if hasattr(signal, 'SIGTERM'):
         signal.signal(signal.SIGTERM, signal_handler)
     
-    if len(sys.argv) == 1:
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
         show_help()
         sys.exit(0)
 
@@ -829,6 +1268,8 @@ def main():
     input_group = parser.add_mutually_exclusive_group(required=True)
     input_group.add_argument('--input', '-i',
                       help='Path to the saved.json file')
+    parser.add_argument('--input-format', choices=['auto', 'json', 'ndjson'], default='auto',
+                      help='Format of the --input file (auto: detect JSON or one post per line)')
     
     # Reddit authentication options
     reddit_group = input_group.add_argument_group('reddit_auth')
@@ -847,70 +1288,48 @@ def main():
     parser.add_argument('--log', '-l', help='Path to log file')
     parser.add_argument('--debug', '-d', action='store_true', help='Enable debug logging for troubleshooting')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    saved_data = None
-    
-    if args.input:
-        # Load from local file
-        try:
-            with open(args.input, 'r', encoding='utf-8') as f:
-                saved_data = json.load(f)
-        except FileNotFoundError:
-            console.print(f"[red]❌ File not found: {args.input}[/red]")
-            sys.exit(1)
-        except json.JSONDecodeError as e:
-            console.print(f"[red]❌ Invalid JSON format in {args.input}: {str(e)}[/red]")
-            sys.exit(1)
-        except PermissionError:
-            console.print(f"[red]❌ Permission denied accessing {args.input}[/red]")
-            sys.exit(1)
-        except Exception as e:
-            console.print(f"[red]❌ Error reading {args.input}: {str(e)}[/red]")
-            sys.exit(1)
-            
-        # Validate saved_data content
-        if not saved_data:
-            console.print(f"[red]❌ Empty file: {args.input}[/red]")
-            sys.exit(1)
-        
-        if isinstance(saved_data, list) and len(saved_data) == 0:
-            console.print(f"[red]❌ No posts found in {args.input}[/red]")
-            sys.exit(1)
-        
-        if isinstance(saved_data, dict) and not saved_data.get('data', {}).get('children'):
-            console.print(f"[red]❌ No posts found in {args.input}[/red]")
-            sys.exit(1)
-    
-    elif args.reddit_session:
-        # Fetch from Reddit API using session cookie
-        console.print("[bold blue]🌐 Fetching saved posts from Reddit...[/bold blue]")
-        
-        # Construct cookie string from individual values
-        cookie_parts = [f"reddit_session={args.reddit_session}"]
-        if args.token_v2:
-            cookie_parts.append(f"token_v2={args.token_v2}")
-        
-        cookies_string = "; ".join(cookie_parts)
-        
     downloader = RedditMediaDownloader(args.output, args.concurrent, args.style, args.log, args.debug)
     
     async def run():
         await downloader.init_session()
         try:
-            if args.reddit_session:
-                saved_data = await downloader.fetch_saved_posts_from_reddit(cookies_string)
-                if not saved_data:
-                    console.print("[red]❌ No saved posts found or failed to fetch from Reddit[/red]")
-                    return
+            if args.input:
+                # Parse on a worker thread so large exports never block the event loop; a bad
+                # file comes back as SystemExit from error_exit and unwinds through the finally
+                posts = await asyncio.get_event_loop().run_in_executor(None, load_saved_posts, args.input, args.input_format)
+            else:
+                # Fetch from Reddit API using session cookie
+                console.print("[bold blue]🌐 Fetching saved posts from Reddit...[/bold blue]")
+                
+                cookies = {'reddit_session': args.reddit_session}
+                if args.token_v2:
+                    cookies['token_v2'] = args.token_v2
+                
+                posts = saved_posts_list(await downloader.fetch_saved_posts_from_reddit(cookies))
+                if not posts:
+                    error_exit("No saved posts found or failed to fetch from Reddit")
             
             console.print("[bold green]🚀 Starting download process...[/bold green]")
-            await downloader.process_posts(saved_data)
+            await downloader.process_posts(posts)
             console.print("[bold green]✨ Download process completed![/bold green]")
         finally:
             await downloader.close_session()
 
-    asyncio.run(run())
+    # libuv-backed loop: cheaper socket readiness dispatch for many concurrent downloads
+    if UVLOOP_AVAILABLE and hasattr(uvloop, 'run'):  # uvloop >= 0.18
+        uvloop.run(run())
+    elif UVLOOP_AVAILABLE:
+        # Older uvloop has no run(); an explicit loop avoids leaving a global policy installed
+        loop = uvloop.new_event_loop()
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    else:
+        asyncio.run(run())
 
 if __name__ == '__main__':
     main()
\ No newline at end of file